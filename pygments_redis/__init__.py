@@ -1 +1 @@
-from pygments_redis.redis import RedisLexer  # noqa
+from pygments_redis.redis import RedisLexer, RedisPipeLexer  # noqa
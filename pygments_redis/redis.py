@@ -3,12 +3,267 @@
 Author: Brad Solomon <brad.solomon.1124@gmail.com>
 """
 
-__all__ = ["RedisLexer"]
+__all__ = ["RedisLexer", "RedisPipeLexer"]
 
 import re
 
 from pygments import lexer, token
 
+# Complete set of Redis commands from https://redis.io/commands.
+# See the notes on token type (2) in RedisLexer for how these were grabbed.
+COMMANDS = (
+    r"APPEND",
+    r"AUTH",
+    r"BGREWRITEAOF",
+    r"BGSAVE",
+    r"BITCOUNT",
+    r"BITFIELD",
+    r"BITOP",
+    r"BITPOS",
+    r"BLPOP",
+    r"BRPOP",
+    r"BRPOPLPUSH",
+    r"BZPOPMIN",
+    r"BZPOPMAX",
+    r"CLIENT ID",
+    r"CLIENT KILL",
+    r"CLIENT LIST",
+    r"CLIENT GETNAME",
+    r"CLIENT PAUSE",
+    r"CLIENT REPLY",
+    r"CLIENT SETNAME",
+    r"CLIENT UNBLOCK",
+    r"CLUSTER ADDSLOTS",
+    r"CLUSTER COUNT-FAILURE-REPORTS",
+    r"CLUSTER COUNTKEYSINSLOT",
+    r"CLUSTER DELSLOTS",
+    r"CLUSTER FAILOVER",
+    r"CLUSTER FORGET",
+    r"CLUSTER GETKEYSINSLOT",
+    r"CLUSTER INFO",
+    r"CLUSTER KEYSLOT",
+    r"CLUSTER MEET",
+    r"CLUSTER NODES",
+    r"CLUSTER REPLICATE",
+    r"CLUSTER RESET",
+    r"CLUSTER SAVECONFIG",
+    r"CLUSTER SET-CONFIG-EPOCH",
+    r"CLUSTER SETSLOT",
+    r"CLUSTER SLAVES",
+    r"CLUSTER REPLICAS",
+    r"CLUSTER SLOTS",
+    r"COMMAND",
+    r"COMMAND COUNT",
+    r"COMMAND GETKEYS",
+    r"COMMAND INFO",
+    r"CONFIG GET",
+    r"CONFIG REWRITE",
+    r"CONFIG SET",
+    r"CONFIG RESETSTAT",
+    r"DBSIZE",
+    r"DEBUG OBJECT",
+    r"DEBUG SEGFAULT",
+    r"DECR",
+    r"DECRBY",
+    r"DEL",
+    r"DISCARD",
+    r"DUMP",
+    r"ECHO",
+    r"EVAL",
+    r"EVALSHA",
+    r"EXEC",
+    r"EXISTS",
+    r"EXPIRE",
+    r"EXPIREAT",
+    r"FLUSHALL",
+    r"FLUSHDB",
+    r"GEOADD",
+    r"GEOHASH",
+    r"GEOPOS",
+    r"GEODIST",
+    r"GEORADIUS",
+    r"GEORADIUSBYMEMBER",
+    r"GET",
+    r"GETBIT",
+    r"GETRANGE",
+    r"GETSET",
+    r"HDEL",
+    r"HEXISTS",
+    r"HGET",
+    r"HGETALL",
+    r"HINCRBY",
+    r"HINCRBYFLOAT",
+    r"HKEYS",
+    r"HLEN",
+    r"HMGET",
+    r"HMSET",
+    r"HSET",
+    r"HSETNX",
+    r"HSTRLEN",
+    r"HVALS",
+    r"INCR",
+    r"INCRBY",
+    r"INCRBYFLOAT",
+    r"INFO",
+    r"KEYS",
+    r"LASTSAVE",
+    r"LINDEX",
+    r"LINSERT",
+    r"LLEN",
+    r"LPOP",
+    r"LPUSH",
+    r"LPUSHX",
+    r"LRANGE",
+    r"LREM",
+    r"LSET",
+    r"LTRIM",
+    r"MEMORY DOCTOR",
+    r"MEMORY HELP",
+    r"MEMORY MALLOC-STATS",
+    r"MEMORY PURGE",
+    r"MEMORY STATS",
+    r"MEMORY USAGE",
+    r"MGET",
+    r"MIGRATE",
+    r"MONITOR",
+    r"MOVE",
+    r"MSET",
+    r"MSETNX",
+    r"MULTI",
+    r"OBJECT",
+    r"PERSIST",
+    r"PEXPIRE",
+    r"PEXPIREAT",
+    r"PFADD",
+    r"PFCOUNT",
+    r"PFMERGE",
+    r"PING",
+    r"PSETEX",
+    r"PSUBSCRIBE",
+    r"PUBSUB",
+    r"PTTL",
+    r"PUBLISH",
+    r"PUNSUBSCRIBE",
+    r"QUIT",
+    r"RANDOMKEY",
+    r"READONLY",
+    r"READWRITE",
+    r"RENAME",
+    r"RENAMENX",
+    r"RESTORE",
+    r"ROLE",
+    r"RPOP",
+    r"RPOPLPUSH",
+    r"RPUSH",
+    r"RPUSHX",
+    r"SADD",
+    r"SAVE",
+    r"SCARD",
+    r"SCRIPT DEBUG",
+    r"SCRIPT EXISTS",
+    r"SCRIPT FLUSH",
+    r"SCRIPT KILL",
+    r"SCRIPT LOAD",
+    r"SDIFF",
+    r"SDIFFSTORE",
+    r"SELECT",
+    r"SET",
+    r"SETBIT",
+    r"SETEX",
+    r"SETNX",
+    r"SETRANGE",
+    r"SHUTDOWN",
+    r"SINTER",
+    r"SINTERSTORE",
+    r"SISMEMBER",
+    r"SLAVEOF",
+    r"REPLICAOF",
+    r"SLOWLOG",
+    r"SMEMBERS",
+    r"SMOVE",
+    r"SORT",
+    r"SPOP",
+    r"SRANDMEMBER",
+    r"SREM",
+    r"STRLEN",
+    r"SUBSCRIBE",
+    r"SUNION",
+    r"SUNIONSTORE",
+    r"SWAPDB",
+    r"SYNC",
+    r"TIME",
+    r"TOUCH",
+    r"TTL",
+    r"TYPE",
+    r"UNSUBSCRIBE",
+    r"UNLINK",
+    r"UNWATCH",
+    r"WAIT",
+    r"WATCH",
+    r"ZADD",
+    r"ZCARD",
+    r"ZCOUNT",
+    r"ZINCRBY",
+    r"ZINTERSTORE",
+    r"ZLEXCOUNT",
+    r"ZPOPMAX",
+    r"ZPOPMIN",
+    r"ZRANGE",
+    r"ZRANGEBYLEX",
+    r"ZREVRANGEBYLEX",
+    r"ZRANGEBYSCORE",
+    r"ZRANK",
+    r"ZREM",
+    r"ZREMRANGEBYLEX",
+    r"ZREMRANGEBYRANK",
+    r"ZREMRANGEBYSCORE",
+    r"ZREVRANGE",
+    r"ZREVRANGEBYSCORE",
+    r"ZREVRANK",
+    r"ZSCORE",
+    r"ZUNIONSTORE",
+    r"SCAN",
+    r"SSCAN",
+    r"HSCAN",
+    r"ZSCAN",
+    r"XINFO",
+    r"XADD",
+    r"XTRIM",
+    r"XDEL",
+    r"XRANGE",
+    r"XREVRANGE",
+    r"XLEN",
+    r"XREAD",
+    r"XGROUP",
+    r"XREADGROUP",
+    r"XACK",
+    r"XCLAIM",
+    r"XPENDING",
+)
+
+
+def _combine_rules(rules, flags):
+    """Compile (regex, tokentype) rules into one pattern.
+
+    Returns the pattern and a map from its group names to token types.
+    Rules with a new state or a callback (e.g. bygroups) aren't
+    supported and raise ValueError.
+    """
+    parts, types = [], {}
+    for i, rule in enumerate(rules):
+        if len(rule) != 2 or rule[1] not in token.Token:
+            raise ValueError(
+                "only (regex, tokentype) rules can be combined, got %r"
+                % (rule,)
+            )
+        regex, ttype = rule
+        if isinstance(regex, lexer.words):
+            regex = regex.get()
+        name = "rule%d" % i
+        parts.append("(?P<%s>%s)" % (name, regex))
+        types[name] = ttype
+    return re.compile("|".join(parts), flags), types
+
 
 class RedisLexer(lexer.RegexLexer):
     """Lexer for `Redis <https://redis.io/>`_ CLI/REPL output."""
@@ -48,8 +303,8 @@ class RedisLexer(lexer.RegexLexer):
     # - https://www.iana.org/assignments/uri-schemes/prov/redis
     #
     # (2) A command.  Case-insensitive, may be one or more words.
-    # Complete set of Redis commands from https://redis.io/commands.
-    # Grabbed via:
+    # The complete set lives in the module-level COMMANDS tuple so that
+    # other code (and the tests) can share it.  Grabbed via:
     #     from urllib.request import urlopen
     #     from bs4 import BeautifulSoup
     #     with urlopen('https://redis.io/commands') as response:
@@ -62,7 +317,9 @@ class RedisLexer(lexer.RegexLexer):
     # (3) A 'reply type' (not sure if there's a more technical term).
     # See cliFormatReplyTTY from:
     # https://github.com/antirez/redis/blob/unstable/deps/hiredis/read.h
-    # for the logic and exhaustive set.
+    # for the logic and exhaustive set.  A reply type never spans more
+    # than one line; letting it do so made every line starting with an
+    # unclosed paren scan to the end of the input (quadratic time).
     #
     # (4) 'Other.'  That is, we treat both arguments to commands and
     # any part of the reply *except* the parenthesized reply type
@@ -73,243 +330,122 @@ class RedisLexer(lexer.RegexLexer):
     tokens = {
         "root": [
             (r"^[^>\n\"]*>", token.Generic.Prompt),
+            (lexer.words(COMMANDS, prefix=r"(?<=> )"), token.Keyword),
+            (r"^\([^)\n]+\)", token.Keyword.Type),
+            (r"\s+", token.Text),
+            (r".+?$", token.Text),
+        ]
+    }
+
+    # The rules above as a single alternation.  Alternatives are tried
+    # in order at each position, exactly like RegexLexer tries its
+    # rules, but in one C-level match per token.
+    _scanner, _scanner_types = _combine_rules(tokens["root"], flags)
+
+    def get_tokens_unprocessed(self, text, stack=("root",)):
+        match = self._scanner.match
+        types = self._scanner_types
+        pos, end = 0, len(text)
+        while pos < end:
+            # Never None: \s+ or .+?$ matches at any position.
+            m = match(text, pos)
+            yield pos, types[m.lastgroup], m.group()
+            pos = m.end()
+
+    def get_tokens_unprocessed_batch(self, texts):
+        """Return ``list(self.get_tokens_unprocessed(text))`` per text."""
+        return [list(self.get_tokens_unprocessed(text)) for text in texts]
+
+    def get_tokens_batch(self, texts, unfiltered=False):
+        """Return ``list(self.get_tokens(text, unfiltered))`` per text."""
+        return [list(self.get_tokens(text, unfiltered)) for text in texts]
+
+
+class RedisPipeLexer(lexer.RegexLexer):
+    """Lexer for non-interactive `redis-cli` output and ``--pipe`` input."""
+
+    name = "Redis pipe"
+    aliases = ["redis-pipe"]
+    flags = re.MULTILINE | re.UNICODE | re.IGNORECASE
+
+    # There is no prompt here, so everything is keyed off the start of
+    # a line.  Covered formats:
+    #
+    # - Command files fed to `redis-cli --pipe`, one command per line:
+    #     SET key:1 "some value"
+    #   and the summary it prints ("errors: 0, replies: 1000000").
+    # - `--scan` output, one key per line.
+    # - `--bigkeys`/`--memkeys` reports: '#' comment header, progress
+    #   lines like "[12.34%] Biggest string found so far ...", and a
+    #   "-------- summary -------" section heading.
+    # - `--stat`: a "------- data ------ --- load --- ..." heading
+    #   followed by a "keys mem clients ..." column header.
+    # - `--latency`/`--latency-history`:
+    #     min: 0, max: 1, avg: 0.19 (427 samples) -- 15.00 seconds range
+    #
+    # These files run to millions of lines, mostly of plain text (keys,
+    # stat rows), and RegexLexer pays for every token in Python.  So
+    # each rule below swallows the rest of its line, and runs of plain
+    # lines are grouped into Text tokens of up to _max_run_lines lines.
+    # (Capped so that output keeps streaming instead of waiting on one
+    # multi-megabyte token.)  The plain-line rule is the negation of
+    # every line-start rule, built from the same regexes so that the two
+    # can't drift apart.  The most common line types go first.
+
+    _max_run_lines = 64
+
+    _line_rules = [
+        # Before commands, since KEYS is one.
+        (r"keys +mem +clients\b[^\n]*\n?", token.Generic.Subheading),
+        (
+            # words() supplies the group around the command itself.
+            r"%s([^\n]*\n?)"
+            % lexer.words(COMMANDS, suffix=r"(?=[ \t]|$)").get(),
+            lexer.bygroups(token.Keyword, token.Text),
+        ),
+        (r"#[^\n]*\n?", token.Comment.Single),
+        (r"-{2,} [^\n]*\n?", token.Generic.Heading),
+        (
+            r"(\[[\d.]+%\])([^\n]*\n?)",
+            lexer.bygroups(token.Number, token.Text),
+        ),
+        (
+            r"(\([^)\n]+\))([^\n]*\n?)",
+            lexer.bygroups(token.Keyword.Type, token.Text),
+        ),
+        (
+            r"(min:)( [^,\n]*, )(max:)( [^,\n]*, )(avg:)([^\n]*\n?)",
+            lexer.bygroups(
+                token.Name.Attribute,
+                token.Text,
+                token.Name.Attribute,
+                token.Text,
+                token.Name.Attribute,
+                token.Text,
+            ),
+        ),
+        (
+            r"(errors:)( [^,\n]*, )(replies:)([^\n]*\n?)",
+            lexer.bygroups(
+                token.Name.Attribute,
+                token.Text,
+                token.Name.Attribute,
+                token.Text,
+            ),
+        ),
+    ]
+
+    tokens = {
+        "root": [("^" + regex, action) for regex, action in _line_rules]
+        + [
             (
-                lexer.words(
-                    (
-                        r"APPEND",
-                        r"AUTH",
-                        r"BGREWRITEAOF",
-                        r"BGSAVE",
-                        r"BITCOUNT",
-                        r"BITFIELD",
-                        r"BITOP",
-                        r"BITPOS",
-                        r"BLPOP",
-                        r"BRPOP",
-                        r"BRPOPLPUSH",
-                        r"BZPOPMIN",
-                        r"BZPOPMAX",
-                        r"CLIENT ID",
-                        r"CLIENT KILL",
-                        r"CLIENT LIST",
-                        r"CLIENT GETNAME",
-                        r"CLIENT PAUSE",
-                        r"CLIENT REPLY",
-                        r"CLIENT SETNAME",
-                        r"CLIENT UNBLOCK",
-                        r"CLUSTER ADDSLOTS",
-                        r"CLUSTER COUNT-FAILURE-REPORTS",
-                        r"CLUSTER COUNTKEYSINSLOT",
-                        r"CLUSTER DELSLOTS",
-                        r"CLUSTER FAILOVER",
-                        r"CLUSTER FORGET",
-                        r"CLUSTER GETKEYSINSLOT",
-                        r"CLUSTER INFO",
-                        r"CLUSTER KEYSLOT",
-                        r"CLUSTER MEET",
-                        r"CLUSTER NODES",
-                        r"CLUSTER REPLICATE",
-                        r"CLUSTER RESET",
-                        r"CLUSTER SAVECONFIG",
-                        r"CLUSTER SET-CONFIG-EPOCH",
-                        r"CLUSTER SETSLOT",
-                        r"CLUSTER SLAVES",
-                        r"CLUSTER REPLICAS",
-                        r"CLUSTER SLOTS",
-                        r"COMMAND",
-                        r"COMMAND COUNT",
-                        r"COMMAND GETKEYS",
-                        r"COMMAND INFO",
-                        r"CONFIG GET",
-                        r"CONFIG REWRITE",
-                        r"CONFIG SET",
-                        r"CONFIG RESETSTAT",
-                        r"DBSIZE",
-                        r"DEBUG OBJECT",
-                        r"DEBUG SEGFAULT",
-                        r"DECR",
-                        r"DECRBY",
-                        r"DEL",
-                        r"DISCARD",
-                        r"DUMP",
-                        r"ECHO",
-                        r"EVAL",
-                        r"EVALSHA",
-                        r"EXEC",
-                        r"EXISTS",
-                        r"EXPIRE",
-                        r"EXPIREAT",
-                        r"FLUSHALL",
-                        r"FLUSHDB",
-                        r"GEOADD",
-                        r"GEOHASH",
-                        r"GEOPOS",
-                        r"GEODIST",
-                        r"GEORADIUS",
-                        r"GEORADIUSBYMEMBER",
-                        r"GET",
-                        r"GETBIT",
-                        r"GETRANGE",
-                        r"GETSET",
-                        r"HDEL",
-                        r"HEXISTS",
-                        r"HGET",
-                        r"HGETALL",
-                        r"HINCRBY",
-                        r"HINCRBYFLOAT",
-                        r"HKEYS",
-                        r"HLEN",
-                        r"HMGET",
-                        r"HMSET",
-                        r"HSET",
-                        r"HSETNX",
-                        r"HSTRLEN",
-                        r"HVALS",
-                        r"INCR",
-                        r"INCRBY",
-                        r"INCRBYFLOAT",
-                        r"INFO",
-                        r"KEYS",
-                        r"LASTSAVE",
-                        r"LINDEX",
-                        r"LINSERT",
-                        r"LLEN",
-                        r"LPOP",
-                        r"LPUSH",
-                        r"LPUSHX",
-                        r"LRANGE",
-                        r"LREM",
-                        r"LSET",
-                        r"LTRIM",
-                        r"MEMORY DOCTOR",
-                        r"MEMORY HELP",
-                        r"MEMORY MALLOC-STATS",
-                        r"MEMORY PURGE",
-                        r"MEMORY STATS",
-                        r"MEMORY USAGE",
-                        r"MGET",
-                        r"MIGRATE",
-                        r"MONITOR",
-                        r"MOVE",
-                        r"MSET",
-                        r"MSETNX",
-                        r"MULTI",
-                        r"OBJECT",
-                        r"PERSIST",
-                        r"PEXPIRE",
-                        r"PEXPIREAT",
-                        r"PFADD",
-                        r"PFCOUNT",
-                        r"PFMERGE",
-                        r"PING",
-                        r"PSETEX",
-                        r"PSUBSCRIBE",
-                        r"PUBSUB",
-                        r"PTTL",
-                        r"PUBLISH",
-                        r"PUNSUBSCRIBE",
-                        r"QUIT",
-                        r"RANDOMKEY",
-                        r"READONLY",
-                        r"READWRITE",
-                        r"RENAME",
-                        r"RENAMENX",
-                        r"RESTORE",
-                        r"ROLE",
-                        r"RPOP",
-                        r"RPOPLPUSH",
-                        r"RPUSH",
-                        r"RPUSHX",
-                        r"SADD",
-                        r"SAVE",
-                        r"SCARD",
-                        r"SCRIPT DEBUG",
-                        r"SCRIPT EXISTS",
-                        r"SCRIPT FLUSH",
-                        r"SCRIPT KILL",
-                        r"SCRIPT LOAD",
-                        r"SDIFF",
-                        r"SDIFFSTORE",
-                        r"SELECT",
-                        r"SET",
-                        r"SETBIT",
-                        r"SETEX",
-                        r"SETNX",
-                        r"SETRANGE",
-                        r"SHUTDOWN",
-                        r"SINTER",
-                        r"SINTERSTORE",
-                        r"SISMEMBER",
-                        r"SLAVEOF",
-                        r"REPLICAOF",
-                        r"SLOWLOG",
-                        r"SMEMBERS",
-                        r"SMOVE",
-                        r"SORT",
-                        r"SPOP",
-                        r"SRANDMEMBER",
-                        r"SREM",
-                        r"STRLEN",
-                        r"SUBSCRIBE",
-                        r"SUNION",
-                        r"SUNIONSTORE",
-                        r"SWAPDB",
-                        r"SYNC",
-                        r"TIME",
-                        r"TOUCH",
-                        r"TTL",
-                        r"TYPE",
-                        r"UNSUBSCRIBE",
-                        r"UNLINK",
-                        r"UNWATCH",
-                        r"WAIT",
-                        r"WATCH",
-                        r"ZADD",
-                        r"ZCARD",
-                        r"ZCOUNT",
-                        r"ZINCRBY",
-                        r"ZINTERSTORE",
-                        r"ZLEXCOUNT",
-                        r"ZPOPMAX",
-                        r"ZPOPMIN",
-                        r"ZRANGE",
-                        r"ZRANGEBYLEX",
-                        r"ZREVRANGEBYLEX",
-                        r"ZRANGEBYSCORE",
-                        r"ZRANK",
-                        r"ZREM",
-                        r"ZREMRANGEBYLEX",
-                        r"ZREMRANGEBYRANK",
-                        r"ZREMRANGEBYSCORE",
-                        r"ZREVRANGE",
-                        r"ZREVRANGEBYSCORE",
-                        r"ZREVRANK",
-                        r"ZSCORE",
-                        r"ZUNIONSTORE",
-                        r"SCAN",
-                        r"SSCAN",
-                        r"HSCAN",
-                        r"ZSCAN",
-                        r"XINFO",
-                        r"XADD",
-                        r"XTRIM",
-                        r"XDEL",
-                        r"XRANGE",
-                        r"XREVRANGE",
-                        r"XLEN",
-                        r"XREAD",
-                        r"XGROUP",
-                        r"XREADGROUP",
-                        r"XACK",
-                        r"XCLAIM",
-                        r"XPENDING",
-                    ),
-                    prefix=r"(?<=> )",
+                r"^(?:(?!%s)[^\n]*\n){1,%d}"
+                % (
+                    "|".join(regex for regex, _ in _line_rules),
+                    _max_run_lines,
                 ),
-                token.Keyword,
+                token.Text,
             ),
-            (r"^\([^)]+\)", token.Keyword.Type),
-            (r"\s+", token.Text),
-            (r".+?$", token.Text),
+            (r"[^\n]+\n?|\n", token.Text),
         ]
     }
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+
+"""Per-snippet cost of RedisLexer vs stock RegexLexer matching.
+
+RedisLexer runs its rules as one combined pattern; RegexLexer tries
+them one by one.  Both are timed through the batch API.
+"""
+
+import timeit
+
+from pygments.lexer import RegexLexer
+
+from pygments_redis import RedisLexer
+
+lexer = RedisLexer()
+
+snippets = [
+    "127.0.0.1:6379> SET foo{0} bar\nOK\n",
+    "127.0.0.1:6379> GET foo{0}\n\"bar\"\n",
+    "127.0.0.1:6379> INCR counter{0}\n(integer) {0}\n",
+    "127.0.0.1:6379> HGET foo{0} bar\n(error) WRONGTYPE Operation\n",
+]
+
+
+def regexlexer(texts):
+    return [
+        list(RegexLexer.get_tokens_unprocessed(lexer, text))
+        for text in texts
+    ]
+
+
+def combined(texts):
+    return lexer.get_tokens_unprocessed_batch(texts)
+
+
+def per_snippet(old, new, texts):
+    # Alternate the two so that both see the same machine load.
+    number = max(1, 20000 // len(texts))
+    best = [float("inf"), float("inf")]
+    for _ in range(9):
+        for i, func in enumerate((old, new)):
+            elapsed = timeit.timeit(lambda: func(texts), number=number)
+            best[i] = min(best[i], elapsed / number / len(texts) * 1e6)
+    return best
+
+
+def bench(size: int) -> None:
+    texts = [snippets[i % len(snippets)].format(i) for i in range(size)]
+    assert regexlexer(texts) == combined(texts)
+    t_old, t_new = per_snippet(regexlexer, combined, texts)
+    print(
+        "{:>5} snippets {:6.2f} us/snippet RegexLexer, "
+        "{:6.2f} us/snippet combined ({:.2f}x)".format(
+            size, t_old, t_new, t_old / t_new
+        )
+    )
+
+
+if __name__ == "__main__":
+    for size in (10, 100, 1000):
+        bench(size)
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+
+"""Throughput of RedisPipeLexer on large non-interactive redis-cli files.
+
+Usage: bench_pipe.py [lines]  (default 1,000,000 lines per input)
+"""
+
+import sys
+import time
+
+from pygments_redis import RedisPipeLexer
+
+lexer = RedisPipeLexer()
+
+
+def pipe_file(lines: int) -> str:
+    return "".join(
+        'SET key:{0} "value {0}"\n'.format(i) for i in range(lines)
+    )
+
+
+def scan_output(lines: int) -> str:
+    return "".join("user:{0}:session\n".format(i) for i in range(lines))
+
+
+def stat_output(lines: int) -> str:
+    header = (
+        "------- data ------ --------------------- load "
+        "-------------------- - child -\n"
+        "keys       mem      clients blocked requests            "
+        "connections\n"
+    )
+    return "".join(
+        header
+        if i % 20 == 0
+        else "{0:<10} 1015.00K 1       0       {0} (+1)  7\n".format(i)
+        for i in range(lines)
+    )
+
+
+def bench(name: str, text: str) -> None:
+    start = time.perf_counter()
+    ntokens = 0
+    for _ in lexer.get_tokens(text):
+        ntokens += 1
+    elapsed = time.perf_counter() - start
+    nlines = text.count("\n")
+    print(
+        "{:<12} {:>9} lines {:>9} tokens {:7.2f}s "
+        "{:>10.0f} lines/s {:6.1f} MB/s".format(
+            name,
+            nlines,
+            ntokens,
+            elapsed,
+            nlines / elapsed,
+            len(text) / elapsed / 1e6,
+        )
+    )
+
+
+if __name__ == "__main__":
+    lines = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    for name, make in (
+        ("--pipe", pipe_file),
+        ("--scan", scan_output),
+        ("--stat", stat_output),
+    ):
+        bench(name, make(lines))
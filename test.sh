@@ -1,6 +1,6 @@
 #!/bin/sh
 NC='\033[0m'
-if python3 -m unittest -v tests/test_redis.py && flake8 --exclude=venv* .; then
+if python3 -m unittest discover -v -s tests && flake8 --exclude=venv* .; then
     GRN='\033[0;32m'
     echo "${GRN}Success${NC}"
     exit 0
@@ -5,8 +5,10 @@ import textwrap
 import unittest
 
 from pygments import token as Token
+from pygments.lexer import bygroups
 
-from pygments_redis import RedisLexer
+from pygments_redis import RedisLexer, RedisPipeLexer
+from pygments_redis.redis import _combine_rules
 
 
 class RedisTest(unittest.TestCase):
@@ -21,6 +23,15 @@ class RedisTest(unittest.TestCase):
             self.assertIsInstance(tup, tuple)
             self.assertEqual(len(tup), 2)
 
+    def test_combine_rules_rejects_unsupported(self):
+        for rule in (
+            (r"x", Token.Text, "#pop"),
+            (r"(x)(y)", bygroups(Token.Text, Token.Text)),
+        ):
+            with self.subTest(msg=repr(rule)):
+                with self.assertRaises(ValueError):
+                    _combine_rules([rule], 0)
+
     def test_get_tokens(self):
         for name, (shellstr, tokentups) in PARAMS.items():
             with self.subTest(msg=name):
@@ -31,6 +42,43 @@ class RedisTest(unittest.TestCase):
                     tokentups,
                 )
 
+    def test_get_tokens_batch(self):
+        texts = [textwrap.dedent(shellstr) for shellstr, _ in PARAMS.values()]
+        self.assertEqual(
+            self.lexer.get_tokens_batch(texts),
+            [tokentups for _, tokentups in PARAMS.values()],
+        )
+        self.assertEqual(self.lexer.get_tokens_batch([]), [])
+
+    def test_get_tokens_unprocessed_batch(self):
+        texts = [textwrap.dedent(shellstr) for shellstr, _ in PARAMS.values()]
+        self.assertEqual(
+            self.lexer.get_tokens_unprocessed_batch(texts),
+            [list(self.lexer.get_tokens_unprocessed(text)) for text in texts],
+        )
+
+
+class RedisPipeTest(unittest.TestCase):
+    def setUp(self):
+        self.lexer = RedisPipeLexer()
+
+    def test_get_tokens(self):
+        for name, (shellstr, tokentups) in PIPE_PARAMS.items():
+            with self.subTest(msg=name):
+                self.assertEqual(
+                    list(self.lexer.get_tokens(textwrap.dedent(shellstr))),
+                    tokentups,
+                )
+
+    def test_get_tokens_long_run(self):
+        # Plain lines are grouped, but never into one unbounded token.
+        text = "".join("user:%d:session\n" % i for i in range(1000))
+        tokens = list(self.lexer.get_tokens(text))
+        self.assertEqual("".join(value for _, value in tokens), text)
+        self.assertEqual(len(tokens), 16)
+        for _, value in tokens:
+            self.assertLessEqual(value.count("\n"), 64)
+
 
 PARAMS = {
     "test_get_tokens_case_insensitive": (
@@ -370,5 +418,121 @@ redis://myapp-001.abcdef.0001.use1.cache.amazonaws.com:6379/0> GET dnekey
     ),
 }
 
+PIPE_PARAMS = {
+    "test_get_tokens_pipe_input": (
+        """\
+SET key:1 "a > b"
+set key:2 v
+CLIENT LIST
+getter
+SETX key
+""",
+        [
+            (Token.Keyword, "SET"),
+            (Token.Text, ' key:1 "a > b"\n'),
+            (Token.Keyword, "set"),
+            (Token.Text, " key:2 v\n"),
+            (Token.Keyword, "CLIENT LIST"),
+            (Token.Text, "\n"),
+            (Token.Text, "getter\nSETX key\n"),
+        ],
+    ),
+    "test_get_tokens_pipe_summary": (
+        """\
+All data transferred. Waiting for the last reply...
+Last reply received from server.
+errors: 0, replies: 1000000
+""",
+        [
+            (
+                Token.Text,
+                "All data transferred. Waiting for the last reply...\n"
+                "Last reply received from server.\n",
+            ),
+            (Token.Name.Attribute, "errors:"),
+            (Token.Text, " 0, "),
+            (Token.Name.Attribute, "replies:"),
+            (Token.Text, " 1000000\n"),
+        ],
+    ),
+    "test_get_tokens_scan": (
+        """\
+user:1:session
+(nil)
+user:2:session
+""",
+        [
+            (Token.Text, "user:1:session\n"),
+            (Token.Keyword.Type, "(nil)"),
+            (Token.Text, "\n"),
+            (Token.Text, "user:2:session\n"),
+        ],
+    ),
+    "test_get_tokens_bigkeys": (
+        """\
+# Scanning the entire keyspace to find biggest keys as well as
+# average sizes per key type.
+
+[00.00%] Biggest string found so far 'key:1' with 3 bytes
+
+-------- summary -------
+
+Sampled 506 keys in the keyspace!
+""",
+        [
+            (
+                Token.Comment.Single,
+                "# Scanning the entire keyspace to find biggest keys as well as\n",  # noqa
+            ),
+            (Token.Comment.Single, "# average sizes per key type.\n"),
+            (Token.Text, "\n"),
+            (Token.Number, "[00.00%]"),
+            (
+                Token.Text,
+                " Biggest string found so far 'key:1' with 3 bytes\n",
+            ),
+            (Token.Text, "\n"),
+            (Token.Generic.Heading, "-------- summary -------\n"),
+            (Token.Text, "\nSampled 506 keys in the keyspace!\n"),
+        ],
+    ),
+    "test_get_tokens_stat": (
+        """\
+------- data ------ --- load --- - child -
+keys       mem      clients blocked requests
+506        1015.00K 1       0       24 (+0)
+507        1015.00K 1       0       25 (+1)
+""",
+        [
+            (
+                Token.Generic.Heading,
+                "------- data ------ --- load --- - child -\n",
+            ),
+            (
+                Token.Generic.Subheading,
+                "keys       mem      clients blocked requests\n",
+            ),
+            (
+                Token.Text,
+                "506        1015.00K 1       0       24 (+0)\n"
+                "507        1015.00K 1       0       25 (+1)\n",
+            ),
+        ],
+    ),
+    "test_get_tokens_latency": (
+        """\
+min: 0, max: 1, avg: 0.19 (427 samples) -- 15.00 seconds range
+""",
+        [
+            (Token.Name.Attribute, "min:"),
+            (Token.Text, " 0, "),
+            (Token.Name.Attribute, "max:"),
+            (Token.Text, " 1, "),
+            (Token.Name.Attribute, "avg:"),
+            (Token.Text, " 0.19 (427 samples) -- 15.00 seconds range\n"),
+        ],
+    ),
+}
+
 if __name__ == "__main__":
     unittest.main()